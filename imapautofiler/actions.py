@@ -11,23 +11,65 @@
 #    under the License.
 
 import abc
+import collections
 import datetime
 import email.message
+import functools
 import logging
 import re
+import sys
 import typing
 from email.utils import parsedate_to_datetime
 
-import jinja2
-
 from imapautofiler import client, i18n, lookup
 
+if typing.TYPE_CHECKING:
+    import jinja2
+
+try:
+    import re2  # type: ignore[import-not-found]
+except ImportError:
+    re2 = None
+
+
+# RE2 treats the character class escapes as ASCII-only where the re
+# module matches them against Unicode text, handles a trailing newline
+# differently for $, and reads [: as the start of a POSIX class such
+# as [[:alpha:]] that re does not support.
+_re2_incompatible: re.Pattern[str] = re.compile(r"\\[wWdDsSbB]|\$|\[:")
+
+
+@functools.lru_cache(maxsize=128)
+def _compile(pattern: str) -> re.Pattern[str]:
+    "Compile the regex, sharing the result between actions."
+    return re.compile(pattern)
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_user(pattern: str) -> re.Pattern[str]:
+    """Compile a regex from the configuration file.
+
+    When the optional google-re2 package is installed the pattern is
+    compiled with RE2, which matches in linear time no matter how the
+    pattern is written. Patterns whose meaning would change under RE2,
+    or that use features it does not support such as backreferences,
+    are compiled with the standard library engine instead.
+
+    """
+    if re2 is not None and not _re2_incompatible.search(pattern):
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            pass
+    return _compile(pattern)
+
 
 class Action(metaclass=abc.ABCMeta):
     "Base class"
 
     _log: logging.Logger = logging.getLogger(__name__)
     NAME: str | None = None
+    __slots__ = ("_cfg", "_data")
 
     def __init__(self, action_data: typing.Any, cfg: typing.Any):
         """Initialize the action.
@@ -75,8 +117,18 @@ class Action(metaclass=abc.ABCMeta):
         raise NotImplementedError()
 
 
+@functools.lru_cache(maxsize=128)
+def _get_template(template_text: str) -> "jinja2.Template":
+    "Compile the template once and reuse it for every message."
+    # jinja2 is slow to import and only needed for mailbox names that
+    # use templates, so wait until one is rendered.
+    import jinja2
+
+    return jinja2.Template(template_text)
+
+
 def _render(template_text: str, message: email.message.Message) -> str:
-    template: jinja2.Template = jinja2.Template(template_text)
+    template: jinja2.Template = _get_template(template_text)
     headers: dict[str, str | typing.Any] = {
         name.lower().replace("-", "_"): i18n.get_header_value(message, name)
         for name in message.keys()
@@ -113,14 +165,23 @@ class Move(Action):
 
     NAME = "move"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ("_dest_mailbox",)
 
     def __init__(self, action_data, cfg):
         super().__init__(action_data, cfg)
+        # Mailbox names repeat across rules and messages, so intern
+        # them to share a single copy of each.
+        self._dest_mailbox: str = sys.intern(str(self._data.get("dest-mailbox", "")))
 
     def _get_dest_mailbox(self, message_id: str, message: email.message.Message) -> str:
-        return _render(
-            template_text=self._data.get("dest-mailbox", ""),
-            message=message,
+        # Only pay for rendering when the name contains template markup.
+        if "{" not in self._dest_mailbox:
+            return self._dest_mailbox
+        return sys.intern(
+            _render(
+                template_text=self._dest_mailbox,
+                message=message,
+            )
         )
 
     def report(
@@ -130,13 +191,15 @@ class Move(Action):
         message_id: str,
         message: email.message.Message,
     ) -> None:
-        self._log.info(
-            "%s[%s] (%s) to %s",
-            mailbox_name,
-            message_id,
-            i18n.get_header_value(message, "subject"),
-            self._get_dest_mailbox(message_id, message),
-        )
+        dest_mailbox = self._get_dest_mailbox(message_id, message)
+        if self._log.isEnabledFor(logging.INFO):
+            self._log.info(
+                "%s[%s] (%s) to %s",
+                mailbox_name,
+                message_id,
+                i18n.get_header_value(message, "subject"),
+                dest_mailbox,
+            )
 
     def invoke(
         self,
@@ -190,6 +253,14 @@ class Sort(Action):
 
     NAME = "sort"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = (
+        "_dest_mailbox_base",
+        "_dest_mailbox_regex",
+        "_dest_mailbox_regex_group",
+        "_group_index",
+        "_header",
+        "_regex_search",
+    )
     _default_header: str = "to"
     _default_regex: str = r"([\w+-]+)@"
 
@@ -200,13 +271,21 @@ class Sort(Action):
     ) -> None:
         super().__init__(action_data, cfg)
         self._header: str = self._data.get("header", self._default_header)
-        self._dest_mailbox_base: str | None = self._data.get("dest-mailbox-base")
-        if not self._dest_mailbox_base:
+        dest_mailbox_base: str | None = self._data.get("dest-mailbox-base")
+        if not dest_mailbox_base:
             raise ValueError(
                 "No dest-mailbox-base given for action {}".format(action_data)
             )
-        self._dest_mailbox_regex: re.Pattern[str] = re.compile(
-            self._data.get("dest-mailbox-regex", self._default_regex)
+        self._dest_mailbox_base: str = sys.intern(str(dest_mailbox_base))
+        self._dest_mailbox_regex: re.Pattern[str]
+        if "dest-mailbox-regex" in self._data:
+            self._dest_mailbox_regex = _compile_user(self._data["dest-mailbox-regex"])
+        else:
+            self._dest_mailbox_regex = _compile(self._default_regex)
+        # search() gives up after position 0 for a pattern starting
+        # with ^, so anchored patterns need no special handling.
+        self._regex_search: typing.Callable[[str], re.Match[str] | None] = (
+            self._dest_mailbox_regex.search
         )
         if not self._dest_mailbox_regex.groups:
             raise ValueError(
@@ -226,34 +305,56 @@ class Sort(Action):
         self._dest_mailbox_regex_group: int = action_data.get(
             "dest-mailbox-regex-group", 0
         )
-
-    def _get_dest_mailbox(self, message_id: str, message: email.message.Message) -> str:
-        header_value = i18n.get_header_value(message, self._header)
-        match = self._dest_mailbox_regex.search(header_value)
-        if not match:
+        group = self._dest_mailbox_regex_group
+        if group < 0:
+            # Count back from the last group, as indexing groups() does.
+            group += self._dest_mailbox_regex.groups
+            if group < 0:
+                raise ValueError(
+                    "dest-mailbox-regex-group {} is out of range for regex {!r}".format(
+                        self._dest_mailbox_regex_group,
+                        self._dest_mailbox_regex.pattern,
+                    )
+                )
+        # Match.group() numbers the groups starting from 1.
+        self._group_index: int = group + 1
+
+    def _get_suffix(self, message_id: str, header_value: str) -> str:
+        "Return the part of the header value that names the mailbox."
+        match = self._regex_search(header_value)
+        # An optional group that did not take part in the match gives
+        # None, which is no more useful than no match at all.
+        suffix = match.group(self._group_index) if match else None
+        if match is None or suffix is None:
             raise ValueError(
                 (
                     "Could not determine destination mailbox from "
                     "{!r} header {!r} with regex {!r}"
-                ).format(self._header, header_value, self._dest_mailbox_regex)
+                ).format(self._header, header_value, self._dest_mailbox_regex.pattern)
             )
-        self._log.debug(
-            "%s %r header %r matched regex %r with %r",
-            message_id,
-            self._header,
-            header_value,
-            self._dest_mailbox_regex.pattern,
-            match.groups(),
-        )
-        self._log.debug(
-            "%s using group %s",
-            message_id,
-            self._dest_mailbox_regex_group,
-        )
-        return "{}{}".format(
-            _render(template_text=str(self._dest_mailbox_base), message=message),
-            match.groups()[self._dest_mailbox_regex_group],
-        )
+        if self._log.isEnabledFor(logging.DEBUG):
+            self._log.debug(
+                "%s %r header %r matched regex %r with %r",
+                message_id,
+                self._header,
+                header_value,
+                self._dest_mailbox_regex.pattern,
+                match.groups(),
+            )
+            self._log.debug(
+                "%s using group %s",
+                message_id,
+                self._dest_mailbox_regex_group,
+            )
+        return suffix
+
+    def _get_dest_mailbox(self, message_id: str, message: email.message.Message) -> str:
+        header_value = i18n.get_header_value(message, self._header)
+        suffix = self._get_suffix(message_id, header_value)
+        base = self._dest_mailbox_base
+        if "{" in base:
+            base = _render(template_text=base, message=message)
+        return sys.intern(base + suffix)
 
     def report(
         self,
@@ -263,13 +364,14 @@ class Sort(Action):
         message: email.message.Message,
     ) -> None:
         dest_mailbox = self._get_dest_mailbox(message_id, message)
-        self._log.info(
-            "%s[%s] (%s) to %s",
-            mailbox_name,
-            message_id,
-            i18n.get_header_value(message, "subject"),
-            dest_mailbox,
-        )
+        if self._log.isEnabledFor(logging.INFO):
+            self._log.info(
+                "%s[%s] (%s) to %s",
+                mailbox_name,
+                message_id,
+                i18n.get_header_value(message, "subject"),
+                dest_mailbox,
+            )
 
     def invoke(
         self,
@@ -300,9 +402,41 @@ class SortMailingList(Sort):
 
     NAME = "sort-mailing-list"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ("_use_default_parse",)
     _default_header: str = "list-id"
     _default_regex: str = r"<?([^.]+)\..*>?"
 
+    def __init__(
+        self,
+        action_data: dict[str, typing.Any],
+        cfg: dict[str, typing.Any],
+    ) -> None:
+        super().__init__(action_data, cfg)
+        self._use_default_parse: bool = (
+            self._dest_mailbox_regex.pattern == self._default_regex
+        )
+
+    def _get_suffix(self, message_id: str, header_value: str) -> str:
+        if not self._use_default_parse:
+            return super()._get_suffix(message_id, header_value)
+        # Equivalent to searching with the default regex, without
+        # running the regex engine: skip any leading dots (search()
+        # retries past them), drop one leading "<" unless it is
+        # directly followed by a dot, then take everything before the
+        # first dot, which must be present.
+        value = header_value.lstrip(".")
+        if value.startswith("<") and not value.startswith("<."):
+            value = value[1:]
+        name, sep, _ = value.partition(".")
+        if not (name and sep):
+            raise ValueError(
+                (
+                    "Could not determine destination mailbox from "
+                    "{!r} header {!r} with regex {!r}"
+                ).format(self._header, header_value, self._dest_mailbox_regex.pattern)
+            )
+        return name
+
 
 class SortByYear(Sort):
     r"""Move the message based on the year in the date header.
@@ -313,6 +447,7 @@ class SortByYear(Sort):
 
     NAME = "sort-by-year"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ()
     _default_header: str = "date"
 
     def _get_dest_mailbox(self, message_id: str, message: email.message.Message) -> str:
@@ -327,7 +462,7 @@ class SortByYear(Sort):
                 err,
             )
             year = "unparsable-date"
-        dest: str = f"{self._dest_mailbox_base}{year}"
+        dest: str = sys.intern(f"{self._dest_mailbox_base}{year}")
         self._log.debug(
             '%s "date" header %r gives year %r and destination %s',
             message_id,
@@ -344,25 +479,23 @@ class Trash(Move):
     The action is indicated with the name ``trash``.
 
     The action expects the global configuration setting
-    ``trash-mailbox``.
+    ``trash-mailbox``, which may be overridden with a ``dest-mailbox``
+    entry in the action data. Otherwise it behaves like ``move``.
 
     """
 
     NAME = "trash"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ()
 
     def __init__(
         self, action_data: dict[str, typing.Any], cfg: dict[str, typing.Any]
     ) -> None:
         super().__init__(action_data, cfg)
-        self._dest_mailbox: str | None = self._data.get("dest-mailbox") or cfg.get(
-            "trash-mailbox"
-        )
-        if self._dest_mailbox is None:
+        dest_mailbox = self._data.get("dest-mailbox") or cfg.get("trash-mailbox")
+        if dest_mailbox is None:
             raise ValueError('no "dest-mailbox" or "trash-mailbox" set in config')
-
-    def _get_dest_mailbox(self, message_id: str, message: email.message.Message) -> str:
-        return str(self._dest_mailbox)
+        self._dest_mailbox = sys.intern(str(dest_mailbox))
 
 
 class Delete(Action):
@@ -374,6 +507,7 @@ class Delete(Action):
 
     NAME = "delete"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ()
 
     def report(
         self,
@@ -382,12 +516,13 @@ class Delete(Action):
         message_id: str,
         message: email.message.Message,
     ) -> None:
-        self._log.info(
-            "%s[%s] (%s)",
-            mailbox_name,
-            message_id,
-            i18n.get_header_value(message, "subject"),
-        )
+        if self._log.isEnabledFor(logging.INFO):
+            self._log.info(
+                "%s[%s] (%s)",
+                mailbox_name,
+                message_id,
+                i18n.get_header_value(message, "subject"),
+            )
 
     def invoke(
         self,
@@ -412,6 +547,7 @@ class Flag(Action):
 
     NAME = "flag"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ()
 
     def __init__(self, action_data, cfg):
         super().__init__(action_data, cfg)
@@ -423,12 +559,13 @@ class Flag(Action):
         message_id: str,
         message: email.message.Message,
     ) -> None:
-        self._log.info(
-            "%s[%s] (%s)",
-            mailbox_name,
-            message_id,
-            i18n.get_header_value(message, "subject"),
-        )
+        if self._log.isEnabledFor(logging.INFO):
+            self._log.info(
+                "%s[%s] (%s)",
+                mailbox_name,
+                message_id,
+                i18n.get_header_value(message, "subject"),
+            )
 
     def invoke(
         self,
@@ -449,6 +586,7 @@ class Unflag(Action):
 
     NAME = "unflag"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ()
 
     def __init__(self, action_data, cfg):
         super().__init__(action_data, cfg)
@@ -460,12 +598,13 @@ class Unflag(Action):
         message_id: str,
         message: email.message.Message,
     ) -> None:
-        self._log.info(
-            "%s[%s] (%s)",
-            mailbox_name,
-            message_id,
-            i18n.get_header_value(message, "subject"),
-        )
+        if self._log.isEnabledFor(logging.INFO):
+            self._log.info(
+                "%s[%s] (%s)",
+                mailbox_name,
+                message_id,
+                i18n.get_header_value(message, "subject"),
+            )
 
     def invoke(
         self,
@@ -486,6 +625,7 @@ class MarkRead(Action):
 
     NAME = "mark_read"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ()
 
     def __init__(self, action_data, cfg):
         super().__init__(action_data, cfg)
@@ -497,12 +637,13 @@ class MarkRead(Action):
         message_id: str,
         message: email.message.Message,
     ) -> None:
-        self._log.info(
-            "%s[%s] (%s)",
-            mailbox_name,
-            message_id,
-            i18n.get_header_value(message, "subject"),
-        )
+        if self._log.isEnabledFor(logging.INFO):
+            self._log.info(
+                "%s[%s] (%s)",
+                mailbox_name,
+                message_id,
+                i18n.get_header_value(message, "subject"),
+            )
 
     def invoke(
         self,
@@ -523,6 +664,7 @@ class MarkUnread(Action):
 
     NAME = "mark_unread"
     _log: logging.Logger = logging.getLogger(NAME)
+    __slots__ = ()
 
     def __init__(self, action_data, cfg):
         super().__init__(action_data, cfg)
@@ -534,12 +676,13 @@ class MarkUnread(Action):
         message_id: str,
         message: email.message.Message,
     ) -> None:
-        self._log.info(
-            "%s[%s] (%s)",
-            mailbox_name,
-            message_id,
-            i18n.get_header_value(message, "subject"),
-        )
+        if self._log.isEnabledFor(logging.INFO):
+            self._log.info(
+                "%s[%s] (%s)",
+                mailbox_name,
+                message_id,
+                i18n.get_header_value(message, "subject"),
+            )
 
     def invoke(
         self,
@@ -555,6 +698,15 @@ _lookup_table: dict[typing.Any | None, typing.Any] = lookup.make_lookup_table(
     Action, "NAME"
 )
 
+# Recently created actions, keyed on the class, the identity of the
+# configuration, and the action data. Each pooled action holds a
+# reference to its configuration, so the id() cannot be reused while
+# the entry exists.
+_instance_pool: collections.OrderedDict[tuple[typing.Any, ...], Action] = (
+    collections.OrderedDict()
+)
+_instance_pool_size: int = 128
+
 
 def factory(action_data: dict[str, typing.Any], cfg: dict[str, typing.Any]) -> Action:
     """Create an Action instance.
@@ -567,8 +719,27 @@ def factory(action_data: dict[str, typing.Any], cfg: dict[str, typing.Any]) -> A
     Using the action type, instantiate an action object that can
     process a message.
 
+    Actions keep no state beyond what they compute when they are
+    created, so an existing instance is returned when the same action
+    data is requested again with the same configuration object.
+
     """
     name: typing.Any | None = action_data.get("name")
-    if name in _lookup_table:
-        return _lookup_table[name](action_data, cfg)
-    raise ValueError("unrecognized rule action {!r}".format(action_data))
+    try:
+        cls = _lookup_table[name]
+    except KeyError:
+        raise ValueError("unrecognized rule action {!r}".format(action_data)) from None
+    try:
+        key = (cls, id(cfg), tuple(sorted(action_data.items())))
+        inst = _instance_pool.get(key)
+    except TypeError:
+        # The action data cannot be used as a key, so do not pool it.
+        return cls(action_data, cfg)
+    if inst is not None and inst._cfg is cfg:
+        _instance_pool.move_to_end(key)
+        return inst
+    inst = cls(action_data, cfg)
+    _instance_pool[key] = inst
+    if len(_instance_pool) > _instance_pool_size:
+        _instance_pool.popitem(last=False)
+    return inst
@@ -64,7 +64,7 @@ def process_rules(cfg, debug, conn, dry_run=False):
             num_messages += 1
             if debug:
                 print(message.as_string().rstrip())
-            else:
+            elif LOG.isEnabledFor(logging.DEBUG):
                 LOG.debug("message %s: %s", msg_id, message["subject"])
 
             for rule in mailbox_rules:
@@ -96,7 +96,17 @@ def process_rules(cfg, debug, conn, dry_run=False):
             # break
 
         # Remove messages that we just moved.
-        conn.expunge()
+        try:
+            num_failed = conn.expunge()
+        except Exception as err:
+            LOG.error("failed to expunge %r: %s", mailbox_name, err)
+            num_errors += 1
+            if debug:
+                raise
+        else:
+            # Queued changes that failed were counted as processed above.
+            num_processed -= num_failed
+            num_errors += num_failed
         LOG.info("completed mailbox %r", mailbox_name)
     LOG.info("encountered %s messages, processed %s", num_messages, num_processed)
     if num_errors:
@@ -172,8 +172,13 @@ class Client(metaclass=abc.ABCMeta):
         """
 
     @abc.abstractmethod
-    def expunge(self) -> None:
-        "Flush any pending changes."
+    def expunge(self) -> int:
+        """Flush any pending changes.
+
+        Returns the number of messages whose queued changes could not
+        be applied.
+
+        """
 
     @abc.abstractmethod
     def close(self) -> None:
@@ -212,6 +217,12 @@ class IMAPClient(Client):
         self._conn.login(username, password)
         self._mbox_names: set[str] | None = None
         self.search = cfg['server'].get('search', 'ALL')
+        # Optionally queue moves and deletes and send them to the
+        # server in bulk when the mailbox is expunged, instead of one
+        # message at a time.
+        self._batch_moves: bool = tobool(cfg["server"].get("batch_moves", False))
+        self._pending_moves: dict[str, list[str]] = {}
+        self._pending_deletes: list[str] = []
 
     def list_mailboxes(self) -> collections.abc.Iterator[str]:
         "Return a list of folder names."
@@ -220,6 +231,8 @@ class IMAPClient(Client):
     def mailbox_iterate(
         self, mailbox_name: str
     ) -> collections.abc.Iterator[tuple[str, email.message.Message]]:
+        # Queued changes apply to the currently selected folder.
+        self._flush_unreported("selecting {!r}".format(mailbox_name))
         self._conn.select_folder(mailbox_name)
         msg_ids: list[str] = self._conn.search(self.search)
         for msg_id in msg_ids:
@@ -253,13 +266,66 @@ class IMAPClient(Client):
         self._ensure_mailbox(dest_mailbox)
         self._conn.copy([message_id], dest_mailbox)
 
+    def move_message(self, src_mailbox, dest_mailbox, message_id, message):
+        if not self._batch_moves:
+            super().move_message(src_mailbox, dest_mailbox, message_id, message)
+            return
+        self._pending_moves.setdefault(dest_mailbox, []).append(message_id)
+
     def delete_message(self, src_mailbox, message_id, message):
-        self._conn.add_flags([message_id], [imapclient.DELETED])
+        if not self._batch_moves:
+            self._conn.add_flags([message_id], [imapclient.DELETED])
+            return
+        self._pending_deletes.append(message_id)
+
+    def _flush(self) -> int:
+        """Send the queued moves and deletes to the server.
+
+        A failure only affects the batch it happens in. It is logged
+        and the remaining batches are still sent. Returns the number
+        of messages that could not be moved or deleted.
+
+        """
+        failed = 0
+        pending_moves, self._pending_moves = self._pending_moves, {}
+        for dest_mailbox, msg_ids in pending_moves.items():
+            LOG.debug("moving %d messages to %s", len(msg_ids), dest_mailbox)
+            try:
+                self._ensure_mailbox(dest_mailbox)
+                self._conn.copy(msg_ids, dest_mailbox)
+                self._conn.add_flags(msg_ids, [imapclient.DELETED])
+            except Exception as err:
+                LOG.error("failed to move %s to %r: %s", msg_ids, dest_mailbox, err)
+                failed += len(msg_ids)
+        pending_deletes, self._pending_deletes = self._pending_deletes, []
+        if pending_deletes:
+            LOG.debug("deleting %d messages", len(pending_deletes))
+            try:
+                self._conn.add_flags(pending_deletes, [imapclient.DELETED])
+            except Exception as err:
+                LOG.error("failed to delete %s: %s", pending_deletes, err)
+                failed += len(pending_deletes)
+        return failed
+
+    def _flush_unreported(self, reason: str) -> None:
+        """Send changes left queued without a call to expunge().
+
+        This is only a safety net, because process_rules expunges each
+        mailbox before moving on. Failures are logged by _flush(), but
+        are not included in the count returned by expunge().
+
+        """
+        if self._pending_moves or self._pending_deletes:
+            LOG.warning("sending changes not yet expunged before %s", reason)
+            self._flush()
 
     def expunge(self):
+        failed = self._flush()
         self._conn.expunge()
+        return failed
 
     def close(self):
+        self._flush_unreported("closing the connection")
         try:
             self._conn.close()
         except Exception:
@@ -326,7 +392,7 @@ class MaildirClient(Client):
             box.remove(message_id)
 
     def expunge(self):
-        pass
+        return 0
 
     def close(self):
         pass
@@ -12,8 +12,19 @@
 
 from email.header import decode_header, make_header
 import email.message
+import functools
+
+
+@functools.lru_cache(maxsize=1024)
+def _decode(value: str) -> str:
+    return str(make_header(decode_header(value)))
 
 
 def get_header_value(msg: email.message.Message, name: str) -> str:
     "Handle header decoding and return a string we examine."
-    return str(make_header(decode_header(msg.get(name, ""))))
+    value = msg.get(name, "")
+    if isinstance(value, str):
+        # Rules and actions examine the same headers repeatedly, so
+        # only decode each distinct value once.
+        return _decode(value)
+    return str(make_header(decode_header(value)))
@@ -236,10 +236,12 @@ class HeaderRegex(_HeaderMatcher):
         super().__init__(rule_data, cfg)
         self._value = rule_data.get("regex", "")
         self._regex = re.compile(self._value)
+        # Bound once here because the rule is checked for every message.
+        self._regex_search = self._regex.search
 
     def _check_rule(self, header_value):
         self._log.debug("%r matches %r", self._regex, header_value)
-        return bool(self._regex.search(header_value))
+        return bool(self._regex_search(header_value))
 
 
 class HeaderExists(Rule):
@@ -10,8 +10,12 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import re
 import unittest
 import unittest.mock as mock
+import warnings
+
+import jinja2
 
 from imapautofiler import actions
 from imapautofiler.tests import base
@@ -33,6 +37,10 @@ class TestRegisteredFactories(object):
     def test_known(self, name):
         assert name in actions._lookup_table
 
+    def test_slots(self, name):
+        for cls in actions._lookup_table[name].__mro__[:-1]:
+            assert "__slots__" in vars(cls), cls
+
 
 class TestFactory(unittest.TestCase):
     def test_unnamed(self):
@@ -47,6 +55,161 @@ class TestFactory(unittest.TestCase):
             actions.factory({"name": "move"}, {})
             lt["move"].assert_called_with({"name": "move"}, {})
 
+    def test_reuse_instance(self):
+        cfg = {}
+        a1 = actions.factory({"name": "move", "dest-mailbox": "here"}, cfg)
+        a2 = actions.factory({"name": "move", "dest-mailbox": "here"}, cfg)
+        self.assertIs(a1, a2)
+
+    def test_reuse_instance_different_data(self):
+        cfg = {}
+        a1 = actions.factory({"name": "move", "dest-mailbox": "here"}, cfg)
+        a2 = actions.factory({"name": "move", "dest-mailbox": "there"}, cfg)
+        self.assertIsNot(a1, a2)
+
+    def test_reuse_instance_different_cfg(self):
+        a1 = actions.factory({"name": "move", "dest-mailbox": "here"}, {})
+        a2 = actions.factory({"name": "move", "dest-mailbox": "here"}, {})
+        self.assertIsNot(a1, a2)
+
+    def test_reuse_delete_across_rules(self):
+        cfg = {}
+        a1 = actions.factory({"name": "delete"}, cfg)
+        actions.factory({"name": "move", "dest-mailbox": "here"}, cfg)
+        a2 = actions.factory({"name": "delete"}, cfg)
+        self.assertIs(a1, a2)
+
+    def test_unhashable_data(self):
+        action_data = {"name": "delete", "extra": ["not", "hashable"]}
+        a1 = actions.factory(action_data, {})
+        self.assertIsInstance(a1, actions.Delete)
+
+
+class TestCompile(unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        actions._compile.cache_clear()
+        actions._compile_user.cache_clear()
+        self.addCleanup(actions._compile.cache_clear)
+        self.addCleanup(actions._compile_user.cache_clear)
+
+    def test_without_re2(self):
+        with mock.patch.object(actions, "re2", None):
+            pattern = actions._compile_user("(.*)")
+        self.assertIsInstance(pattern, re.Pattern)
+
+    def test_with_re2(self):
+        re2 = mock.Mock()
+        with mock.patch.object(actions, "re2", re2):
+            pattern = actions._compile_user("(.*)")
+        re2.compile.assert_called_once_with("(.*)")
+        self.assertIs(re2.compile.return_value, pattern)
+
+    def test_re2_unsupported_pattern(self):
+        re2 = mock.Mock()
+        re2.error = ValueError
+        re2.compile.side_effect = ValueError("invalid escape sequence")
+        with mock.patch.object(actions, "re2", re2):
+            pattern = actions._compile_user(r"(a)\1")
+        self.assertIsInstance(pattern, re.Pattern)
+
+    def test_re2_incompatible_pattern(self):
+        re2 = mock.Mock()
+        with mock.patch.object(actions, "re2", re2), warnings.catch_warnings():
+            # re warns that [[ may become a nested set in the future.
+            warnings.simplefilter("ignore", FutureWarning)
+            for text in (
+                r"(\w+)@",
+                r"(\d+)",
+                r"\b(.*)",
+                r"(.*)$",
+                r"([[:alpha:]]+)",
+            ):
+                with self.subTest(pattern=text):
+                    pattern = actions._compile_user(text)
+                    self.assertIsInstance(pattern, re.Pattern)
+        re2.compile.assert_not_called()
+
+    def test_default_never_uses_re2(self):
+        re2 = mock.Mock()
+        with mock.patch.object(actions, "re2", re2):
+            m = actions.Sort(
+                {"name": "sort", "dest-mailbox-base": "lists-go-under-here."},
+                {},
+            )
+        re2.compile.assert_not_called()
+        self.assertIsInstance(m._dest_mailbox_regex, re.Pattern)
+
+
+@unittest.skipIf(actions.re2 is None, "google-re2 is not installed")
+class TestRE2(base.TestCase):
+    def setUp(self):
+        super().setUp()
+        actions._compile_user.cache_clear()
+        self.addCleanup(actions._compile_user.cache_clear)
+
+    def test_default_unicode(self):
+        m = actions.Sort(
+            {"name": "sort", "dest-mailbox-base": "lists-go-under-here."},
+            {},
+        )
+        self.msg.replace_header("to", "josé@example.com")
+        dest = m._get_dest_mailbox("id-here", self.msg)
+        self.assertEqual("lists-go-under-here.josé", dest)
+
+    def test_user_regex_unicode(self):
+        m = actions.Sort(
+            {
+                "name": "sort",
+                "dest-mailbox-base": "lists-go-under-here.",
+                "dest-mailbox-regex": r"([\w+-]+)@",
+            },
+            {},
+        )
+        self.msg.replace_header("to", "josé@example.com")
+        dest = m._get_dest_mailbox("id-here", self.msg)
+        self.assertEqual("lists-go-under-here.josé", dest)
+
+    def test_user_regex_uses_re2(self):
+        m = actions.Sort(
+            {
+                "name": "sort",
+                "dest-mailbox-base": "lists-go-under-here.",
+                "dest-mailbox-regex": r"([^@]+)@",
+            },
+            {},
+        )
+        self.assertNotIsInstance(m._dest_mailbox_regex, re.Pattern)
+        self.msg.replace_header("to", "josé@example.com")
+        dest = m._get_dest_mailbox("id-here", self.msg)
+        self.assertEqual("lists-go-under-here.josé", dest)
+
+    def test_user_regex_posix_class(self):
+        with warnings.catch_warnings():
+            # re warns that [[ may become a nested set in the future.
+            warnings.simplefilter("ignore", FutureWarning)
+            m = actions.Sort(
+                {
+                    "name": "sort",
+                    "dest-mailbox-base": "lists-go-under-here.",
+                    "dest-mailbox-regex": r"([[:alpha:]]+)@",
+                },
+                {},
+            )
+        self.assertIsInstance(m._dest_mailbox_regex, re.Pattern)
+
+    def test_no_match_error_shows_pattern(self):
+        m = actions.Sort(
+            {
+                "name": "sort",
+                "dest-mailbox-base": "lists-go-under-here.",
+                "dest-mailbox-regex": r"<([^>]+)>",
+            },
+            {},
+        )
+        with self.assertRaisesRegex(ValueError, re.escape(repr(r"<([^>]+)>"))):
+            m._get_dest_mailbox("id-here", self.msg)
+
 
 class TestMove(base.TestCase):
     def test_static_mailbox_name(self):
@@ -73,6 +236,25 @@ class TestMove(base.TestCase):
             dest_mailbox,
         )
 
+    def test_template_compiled_once(self):
+        m = actions.Move(
+            {"name": "move", "dest-mailbox": "archive.{{ date.year }}.once"},
+            {},
+        )
+        with mock.patch.object(jinja2, "Template", wraps=jinja2.Template) as t:
+            m._get_dest_mailbox("id-here", self.without_offset_msg)
+            m._get_dest_mailbox("id-there", self.without_offset_msg)
+        t.assert_called_once_with("archive.{{ date.year }}.once")
+
+    def test_static_mailbox_name_skips_render(self):
+        m = actions.Move(
+            {"name": "move", "dest-mailbox": "msg-goes-here"},
+            {},
+        )
+        with mock.patch.object(actions, "_render") as render:
+            m._get_dest_mailbox("id-here", self.msg)
+        render.assert_not_called()
+
     def test_invoke(self):
         m = actions.Move(
             {"name": "move", "dest-mailbox": "msg-goes-here"},
@@ -102,6 +284,17 @@ class TestSort(base.TestCase):
         self.assertEqual("lists-go-under-here.", m._dest_mailbox_base)
         self.assertEqual(m._default_regex, m._dest_mailbox_regex.pattern)
 
+    def test_create_shares_regex(self):
+        m1 = actions.Sort(
+            {"name": "sort", "dest-mailbox-base": "lists-go-under-here."},
+            {},
+        )
+        m2 = actions.Sort(
+            {"name": "sort", "dest-mailbox-base": "other-lists."},
+            {},
+        )
+        self.assertIs(m1._dest_mailbox_regex, m2._dest_mailbox_regex)
+
     def test_create_missing_base(self):
         self.assertRaises(
             ValueError,
@@ -146,6 +339,86 @@ class TestSort(base.TestCase):
         )
         self.assertEqual(1, m._dest_mailbox_regex_group)
 
+    def test_get_dest_mailbox_partially_anchored_regex(self):
+        m = actions.Sort(
+            {
+                "name": "sort",
+                "dest-mailbox-base": "lists-go-under-here.",
+                "dest-mailbox-regex": r"^(zz)|(x)b@",
+                "dest-mailbox-regex-group": 1,
+            },
+            {},
+        )
+        self.msg.replace_header("to", "yxb@example.com")
+        dest = m._get_dest_mailbox("id-here", self.msg)
+        self.assertEqual(
+            "lists-go-under-here.x",
+            dest,
+        )
+
+    def test_get_dest_mailbox_optional_group_unmatched(self):
+        m = actions.Sort(
+            {
+                "name": "sort",
+                "dest-mailbox-base": "lists-go-under-here.",
+                "dest-mailbox-regex": r"(zz)?@",
+            },
+            {},
+        )
+        self.msg.replace_header("to", "abc@example.com")
+        self.assertRaisesRegex(
+            ValueError,
+            "Could not determine destination mailbox",
+            m._get_dest_mailbox,
+            "id-here",
+            self.msg,
+        )
+
+    def test_get_dest_mailbox_negative_group(self):
+        m = actions.Sort(
+            {
+                "name": "sort",
+                "dest-mailbox-base": "lists-go-under-here.",
+                "dest-mailbox-regex": r"(.*)@(.*)",
+                "dest-mailbox-regex-group": -1,
+            },
+            {},
+        )
+        dest = m._get_dest_mailbox("id-here", self.msg)
+        self.assertEqual(
+            "lists-go-under-here.example.com",
+            dest,
+        )
+
+    def test_create_negative_group_out_of_range(self):
+        self.assertRaises(
+            ValueError,
+            actions.Sort,
+            {
+                "name": "sort",
+                "dest-mailbox-base": "lists-go-under-here.",
+                "dest-mailbox-regex": r"(.*)@(.*)",
+                "dest-mailbox-regex-group": -3,
+            },
+            {},
+        )
+
+    def test_get_dest_mailbox_multi_group_regex(self):
+        m = actions.Sort(
+            {
+                "name": "sort",
+                "dest-mailbox-base": "lists-go-under-here.",
+                "dest-mailbox-regex": r"(.*)@(.*)",
+                "dest-mailbox-regex-group": 1,
+            },
+            {},
+        )
+        dest = m._get_dest_mailbox("id-here", self.msg)
+        self.assertEqual(
+            "lists-go-under-here.example.com",
+            dest,
+        )
+
     def test_get_dest_mailbox_default(self):
         m = actions.Sort(
             {"name": "sort", "dest-mailbox-base": "lists-go-under-here."},
@@ -157,6 +430,15 @@ class TestSort(base.TestCase):
             dest,
         )
 
+    def test_get_dest_mailbox_static_base_skips_render(self):
+        m = actions.Sort(
+            {"name": "sort", "dest-mailbox-base": "lists-go-under-here."},
+            {},
+        )
+        with mock.patch.object(actions, "_render") as render:
+            m._get_dest_mailbox("id-here", self.msg)
+        render.assert_not_called()
+
     def test_get_dest_mailbox_i18n(self):
         m = actions.Sort(
             {"name": "sort", "dest-mailbox-base": "lists-go-under-here."},
@@ -286,6 +568,55 @@ class TestSortMailingList(base.TestCase):
             dest,
         )
 
+    def test_get_dest_mailbox_default_leading_dot(self):
+        m = actions.SortMailingList(
+            {"name": "sort-mailing-list", "dest-mailbox-base": "lists-go-under-here."},
+            {},
+        )
+        self.msg["list-id"] = ".foo.example.com"
+        dest = m._get_dest_mailbox("id-here", self.msg)
+        self.assertEqual(
+            "lists-go-under-here.foo",
+            dest,
+        )
+
+    def test_get_dest_mailbox_default_skips_regex(self):
+        m = actions.SortMailingList(
+            {"name": "sort-mailing-list", "dest-mailbox-base": "lists-go-under-here."},
+            {},
+        )
+        m._regex_search = mock.Mock()
+        self.msg["list-id"] = "<sphinx-dev.googlegroups.com>"
+        dest = m._get_dest_mailbox("id-here", self.msg)
+        self.assertEqual(
+            "lists-go-under-here.sphinx-dev",
+            dest,
+        )
+        m._regex_search.assert_not_called()
+
+    def test_get_dest_mailbox_interned(self):
+        m = actions.SortMailingList(
+            {"name": "sort-mailing-list", "dest-mailbox-base": "lists-go-under-here."},
+            {},
+        )
+        self.msg["list-id"] = "<sphinx-dev.googlegroups.com>"
+        dest1 = m._get_dest_mailbox("id-here", self.msg)
+        dest2 = m._get_dest_mailbox("id-there", self.msg)
+        self.assertIs(dest1, dest2)
+
+    def test_get_dest_mailbox_default_no_match(self):
+        m = actions.SortMailingList(
+            {"name": "sort-mailing-list", "dest-mailbox-base": "lists-go-under-here."},
+            {},
+        )
+        self.msg["list-id"] = "<localhost>"
+        self.assertRaises(
+            ValueError,
+            m._get_dest_mailbox,
+            "id-here",
+            self.msg,
+        )
+
     def test_get_dest_mailbox_regex(self):
         m = actions.SortMailingList(
             {
@@ -471,6 +802,19 @@ class TestDelete(base.TestCase):
         m.invoke(conn, "src-mailbox", "id-here", self.msg)
         conn.delete_message.assert_called_once_with("src-mailbox", "id-here", self.msg)
 
+    def test_report_logging_disabled(self):
+        m = actions.Delete(
+            {"name": "delete"},
+            {},
+        )
+        conn = mock.Mock()
+        with (
+            mock.patch.object(m._log, "isEnabledFor", return_value=False),
+            mock.patch.object(actions.i18n, "get_header_value") as ghv,
+        ):
+            m.report(conn, "src-mailbox", "id-here", self.msg)
+        ghv.assert_not_called()
+
 
 class TestFlag(base.TestCase):
     def test_flag(self):
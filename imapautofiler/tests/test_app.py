@@ -0,0 +1,51 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest.mock as mock
+
+from imapautofiler import app
+from imapautofiler.tests import base
+
+
+class TestProcessRules(base.TestCase):
+    def setUp(self):
+        super().setUp()
+        rule = {
+            "headers": [{"name": "to", "substring": "recipient1"}],
+            "action": {"name": "delete"},
+        }
+        self.cfg = {
+            "mailboxes": [
+                {"name": "first", "rules": [rule]},
+                {"name": "second", "rules": [rule]},
+            ],
+        }
+        self.conn = mock.Mock()
+        self.conn.mailbox_iterate.side_effect = lambda name: [("id-here", self.msg)]
+
+    def test_expunge_error_continues(self):
+        self.conn.expunge.side_effect = [RuntimeError("server went away"), 0]
+        with self.assertLogs("imapautofiler", "INFO") as logs:
+            app.process_rules(self.cfg, False, self.conn)
+        self.conn.mailbox_iterate.assert_has_calls(
+            [mock.call("first"), mock.call("second")]
+        )
+        self.assertIn("INFO:imapautofiler:encountered 1 errors", logs.output)
+
+    def test_expunge_failed_changes_counted(self):
+        self.conn.expunge.side_effect = [1, 0]
+        with self.assertLogs("imapautofiler", "INFO") as logs:
+            app.process_rules(self.cfg, False, self.conn)
+        self.assertIn(
+            "INFO:imapautofiler:encountered 2 messages, processed 1", logs.output
+        )
+        self.assertIn("INFO:imapautofiler:encountered 1 errors", logs.output)
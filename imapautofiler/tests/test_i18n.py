@@ -0,0 +1,40 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from email.header import Header
+from email.message import Message
+
+from imapautofiler import i18n
+from imapautofiler.tests import base
+
+
+class TestGetHeaderValue(base.TestCase):
+    def test_decoded(self):
+        self.assertEqual(
+            "Re: ответ на предыдущее сообщение",
+            i18n.get_header_value(self.i18n_msg, "subject"),
+        )
+
+    def test_missing(self):
+        self.assertEqual("", i18n.get_header_value(self.msg, "list-id"))
+
+    def test_decoded_once(self):
+        i18n._decode.cache_clear()
+        i18n.get_header_value(self.i18n_msg, "subject")
+        i18n.get_header_value(self.i18n_msg, "subject")
+        info = i18n._decode.cache_info()
+        self.assertEqual((1, 1), (info.hits, info.misses))
+
+    def test_header_object(self):
+        msg = Message()
+        msg["subject"] = Header("ответ", "utf-8")
+        self.assertEqual("ответ", i18n.get_header_value(msg, "subject"))
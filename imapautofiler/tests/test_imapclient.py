@@ -0,0 +1,121 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import unittest
+import unittest.mock as mock
+
+import imapclient
+
+from imapautofiler import client
+
+
+class IMAPClientTest(unittest.TestCase):
+    def _make_client(self, **server):
+        cfg = {
+            "server": {
+                "hostname": "example.com",
+                "username": "my-user@example.com",
+                "password": "super-secret",
+            },
+        }
+        cfg["server"].update(server)
+        patcher = mock.patch("imapclient.IMAPClient")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        c = client.IMAPClient(cfg)
+        c._mbox_names = {"INBOX", "dest1", "dest2"}
+        return c
+
+    def test_move_message_batched(self):
+        c = self._make_client(batch_moves="true")
+        c.move_message("INBOX", "dest1", 1, None)
+        c.move_message("INBOX", "dest2", 2, None)
+        c.move_message("INBOX", "dest1", 3, None)
+        c._conn.copy.assert_not_called()
+        c.expunge()
+        c._conn.copy.assert_has_calls(
+            [
+                mock.call([1, 3], "dest1"),
+                mock.call([2], "dest2"),
+            ]
+        )
+        c._conn.add_flags.assert_has_calls(
+            [
+                mock.call([1, 3], [imapclient.DELETED]),
+                mock.call([2], [imapclient.DELETED]),
+            ]
+        )
+        c._conn.expunge.assert_called_once_with()
+
+    def test_delete_message_batched(self):
+        c = self._make_client(batch_moves="true")
+        c.delete_message("INBOX", 1, None)
+        c.delete_message("INBOX", 2, None)
+        c._conn.add_flags.assert_not_called()
+        c.expunge()
+        c._conn.add_flags.assert_called_once_with([1, 2], [imapclient.DELETED])
+
+    def test_flush_before_select(self):
+        c = self._make_client(batch_moves="true")
+        c.delete_message("INBOX", 1, None)
+        c._conn.search.return_value = []
+        with self.assertLogs("imapautofiler.client", "WARNING") as logs:
+            list(c.mailbox_iterate("other"))
+        self.assertIn("before selecting 'other'", logs.output[0])
+        c._conn.add_flags.assert_called_once_with([1], [imapclient.DELETED])
+
+    def test_flush_on_close(self):
+        c = self._make_client(batch_moves="true")
+        c.move_message("INBOX", "dest1", 1, None)
+        with self.assertLogs("imapautofiler.client", "WARNING") as logs:
+            c.close()
+        self.assertIn("before closing the connection", logs.output[0])
+        c._conn.copy.assert_called_once_with([1], "dest1")
+        c._conn.logout.assert_called_once_with()
+
+    def test_nothing_pending_no_warning(self):
+        c = self._make_client(batch_moves="true")
+        c.move_message("INBOX", "dest1", 1, None)
+        c.expunge()
+        c._conn.search.return_value = []
+        with self.assertNoLogs("imapautofiler.client", "WARNING"):
+            list(c.mailbox_iterate("other"))
+            c.close()
+
+    def test_move_message_failing_destination(self):
+        c = self._make_client(batch_moves="true")
+        c._conn.create_folder.side_effect = imapclient.exceptions.IMAPClientError(
+            "cannot create"
+        )
+        c.move_message("INBOX", "new-dest", 1, None)
+        c.move_message("INBOX", "dest1", 2, None)
+        c.delete_message("INBOX", 3, None)
+        with self.assertLogs("imapautofiler.client", "ERROR") as logs:
+            failed = c.expunge()
+        self.assertEqual(1, failed)
+        self.assertIn("[1]", logs.output[0])
+        self.assertIn("'new-dest'", logs.output[0])
+        c._conn.copy.assert_called_once_with([2], "dest1")
+        c._conn.add_flags.assert_has_calls(
+            [
+                mock.call([2], [imapclient.DELETED]),
+                mock.call([3], [imapclient.DELETED]),
+            ]
+        )
+        c._conn.expunge.assert_called_once_with()
+
+    def test_move_message_unbatched(self):
+        c = self._make_client()
+        c.move_message("INBOX", "dest1", 1, None)
+        c._conn.copy.assert_called_once_with([1], "dest1")
+        c._conn.add_flags.assert_called_once_with([1], [imapclient.DELETED])
+        self.assertEqual(0, c.expunge())